@@ -0,0 +1,265 @@
+# adapters/_caption_cache.py
+"""
+Two-tier cache for generated captions.
+- In-process LRU (OrderedDict) in front, so hot keys skip sqlite entirely.
+- sqlite3 store under runs/.caption_cache/ so hits survive restarts. Expired
+  rows are swept on write and the table is capped at CACHE_MAX_ROWS (oldest
+  expiry evicted first), which keeps it to a few tens of MB.
+Keys are sha1(brand|product|n|PROMPT_VERSION); bump PROMPT_VERSION whenever
+the prompt changes so stale captions are not served.
+
+Optional semantic layer (SEMANTIC_CACHE=true): near-duplicate brand/product
+strings ("Nike Air Max 90" vs "Nike AirMax90") are matched by embedding
+similarity, using sentence-transformers + faiss when both are installed.
+"""
+
+import hashlib
+import json
+import os
+import sqlite3
+import threading
+import time
+from collections import OrderedDict
+from pathlib import Path
+from typing import List, Optional
+
+PROMPT_VERSION = "v1"
+CACHE_DIR = Path(__file__).resolve().parent.parent / "runs" / ".caption_cache"
+CACHE_TTL = 7 * 24 * 3600  # seconds
+MEMORY_ENTRIES = 256
+CACHE_MAX_ROWS = 50000  # ~12 captions of <100 chars each -> well under 64 MB
+
+SEMANTIC_ENABLED = os.environ.get("SEMANTIC_CACHE", "false").lower() == "true"
+SEMANTIC_MODEL = "sentence-transformers/all-MiniLM-L6-v2"
+SEMANTIC_THRESHOLD = 0.85  # cosine similarity
+SEMANTIC_MAX_ENTRIES = 10000
+
+_lock = threading.Lock()
+_memory = OrderedDict()  # key -> (captions tuple, expires_at)
+_conn = None
+
+
+def cache_key(brand: str, product: str, n: int) -> str:
+    return hashlib.sha1(f"{brand}|{product}|{n}|{PROMPT_VERSION}".encode("utf-8")).hexdigest()
+
+
+def _db():
+    global _conn
+    if _conn is None:
+        CACHE_DIR.mkdir(parents=True, exist_ok=True)
+        _conn = sqlite3.connect(str(CACHE_DIR / "captions.sqlite3"), check_same_thread=False)
+        _conn.execute(
+            "CREATE TABLE IF NOT EXISTS captions (key TEXT PRIMARY KEY, captions TEXT NOT NULL, expires REAL NOT NULL)"
+        )
+        _conn.execute("CREATE INDEX IF NOT EXISTS captions_expires ON captions (expires)")
+        _conn.commit()
+    return _conn
+
+
+def _remember(key: str, captions, expires: float):
+    _memory[key] = (tuple(captions), expires)
+    _memory.move_to_end(key)
+    while len(_memory) > MEMORY_ENTRIES:
+        _memory.popitem(last=False)
+
+
+def get(key: str) -> Optional[List[str]]:
+    """Return cached captions for key, or None on miss / expiry."""
+    now = time.time()
+    with _lock:
+        hit = _memory.get(key)
+        if hit is not None:
+            if hit[1] > now:
+                _memory.move_to_end(key)
+                return list(hit[0])
+            del _memory[key]
+
+        try:
+            row = _db().execute("SELECT captions, expires FROM captions WHERE key = ?", (key,)).fetchone()
+        except sqlite3.Error as e:
+            print("Caption cache read error:", e)
+            return None
+        if row is None or row[1] <= now:
+            return None
+        captions = json.loads(row[0])
+        _remember(key, captions, row[1])
+        return list(captions)
+
+
+def put(key: str, captions: List[str], ttl: int = CACHE_TTL):
+    now = time.time()
+    expires = now + ttl
+    with _lock:
+        _remember(key, captions, expires)
+        try:
+            db = _db()
+            db.execute(
+                "INSERT OR REPLACE INTO captions (key, captions, expires) VALUES (?, ?, ?)",
+                (key, json.dumps(list(captions)), expires),
+            )
+            # keep the store bounded: drop expired rows, then the soonest-to-expire
+            # rows beyond CACHE_MAX_ROWS (with a fixed TTL, the oldest writes)
+            db.execute("DELETE FROM captions WHERE expires <= ?", (now,))
+            db.execute(
+                "DELETE FROM captions WHERE key IN ("
+                "SELECT key FROM captions ORDER BY expires LIMIT max(0, (SELECT COUNT(*) FROM captions) - ?))",
+                (CACHE_MAX_ROWS,),
+            )
+            db.commit()
+        except sqlite3.Error as e:
+            print("Caption cache write error:", e)
+
+
+# ---------- Semantic layer ----------
+
+class _SemanticIndex:
+    """
+    Embeddings of "brand product" strings in a faiss inner-product index
+    (vectors are L2-normalised, so inner product == cosine similarity).
+    Bounded to SEMANTIC_MAX_ENTRIES; the least recently used entry is evicted.
+    Persisted as <prefix>_vectors.npy + <prefix>_entries.json (no pickle).
+    """
+
+    def __init__(self, prefix: Path):
+        import faiss
+        import numpy as np
+        from sentence_transformers import SentenceTransformer
+
+        self._np = np
+        self._faiss = faiss
+        self.vectors_path = prefix.with_name(prefix.name + "_vectors.npy")
+        self.entries_path = prefix.with_name(prefix.name + "_entries.json")
+        self.model = SentenceTransformer(SEMANTIC_MODEL)
+        self.entries = []  # [(brand, product)], position == faiss id
+        self.last_used = []
+        self.vectors = np.zeros((0, self.model.get_sentence_embedding_dimension()), dtype=np.float32)
+        self.tick = 0
+        self.version = 0  # bumped on every add; see save()
+        self._saved_version = 0
+        self._save_lock = threading.Lock()
+        if self.vectors_path.exists() and self.entries_path.exists():
+            try:
+                vectors = np.load(self.vectors_path, allow_pickle=False).astype(np.float32)
+                with open(self.entries_path, "r", encoding="utf-8") as f:
+                    entries = [tuple(e) for e in json.load(f)]
+                if vectors.shape != (len(entries), self.vectors.shape[1]):
+                    raise ValueError("vectors/entries mismatch")
+                self.entries, self.vectors = entries, vectors
+                self.last_used = [0] * len(self.entries)
+            except Exception as e:
+                print("Semantic cache load error (starting empty):", e)
+        self.index = faiss.IndexFlatIP(self.vectors.shape[1])
+        if len(self.entries):
+            self.index.add(self.vectors)
+
+    def _embed(self, brand: str, product: str):
+        vec = self.model.encode([f"{brand} {product}"], normalize_embeddings=True)
+        return self._np.asarray(vec, dtype=self._np.float32)
+
+    def nearest(self, brand: str, product: str):
+        """Return the stored (brand, product) most similar to the query, if above threshold."""
+        if not self.entries:
+            return None
+        scores, ids = self.index.search(self._embed(brand, product), 1)
+        i = int(ids[0][0])
+        if i < 0 or scores[0][0] < SEMANTIC_THRESHOLD:
+            return None
+        self.tick += 1
+        self.last_used[i] = self.tick
+        return self.entries[i]
+
+    def add(self, brand: str, product: str):
+        """
+        Index brand/product. Returns a snapshot for save(), or None if it was
+        already indexed. Callers hold _semantic_lock; save() runs after it.
+        """
+        if (brand, product) in self.entries:
+            return None
+        if len(self.entries) >= SEMANTIC_MAX_ENTRIES:
+            victim = min(range(len(self.last_used)), key=self.last_used.__getitem__)
+            self.index.remove_ids(self._np.array([victim], dtype=self._np.int64))
+            del self.entries[victim]
+            del self.last_used[victim]
+            self.vectors = self._np.delete(self.vectors, victim, axis=0)
+        vec = self._embed(brand, product)
+        self.index.add(vec)
+        self.entries.append((brand, product))
+        self.tick += 1
+        self.last_used.append(self.tick)
+        # vstack/delete build new arrays, so the snapshot is never mutated later
+        self.vectors = self._np.vstack([self.vectors, vec])
+        self.version += 1
+        return self.version, list(self.entries), self.vectors
+
+    def save(self, snapshot):
+        """
+        Write a snapshot from add() to disk. Runs outside _semantic_lock so
+        lookups never wait on the write; a snapshot older than the one already
+        on disk is skipped.
+        """
+        version, entries, vectors = snapshot
+        with self._save_lock:
+            if version <= self._saved_version:
+                return
+            self.vectors_path.parent.mkdir(parents=True, exist_ok=True)
+            tmp_vectors = self.vectors_path.with_name(self.vectors_path.name + ".tmp")
+            tmp_entries = self.entries_path.with_name(self.entries_path.name + ".tmp")
+            with open(tmp_vectors, "wb") as f:
+                self._np.save(f, vectors, allow_pickle=False)
+            with open(tmp_entries, "w", encoding="utf-8") as f:
+                json.dump(entries, f)
+            os.replace(tmp_vectors, self.vectors_path)
+            os.replace(tmp_entries, self.entries_path)
+            self._saved_version = version
+
+
+_semantic_lock = threading.Lock()
+_semantic = None  # _SemanticIndex once loaded, False if unavailable
+
+
+def _semantic_index() -> Optional[_SemanticIndex]:
+    global _semantic
+    if not SEMANTIC_ENABLED:
+        return None
+    if _semantic is None:
+        try:
+            _semantic = _SemanticIndex(CACHE_DIR / "semantic")
+        except Exception as e:
+            print("Semantic caption cache unavailable:", e)
+            _semantic = False
+    return _semantic or None
+
+
+def get_similar(brand: str, product: str, n: int) -> Optional[List[str]]:
+    """Captions cached for a near-duplicate brand/product pair, or None."""
+    with _semantic_lock:
+        index = _semantic_index()
+        if index is None:
+            return None
+        try:
+            match = index.nearest(brand, product)
+        except Exception as e:
+            print("Semantic cache lookup error:", e)
+            return None
+    if match is None:
+        return None
+    return get(cache_key(match[0], match[1], n))
+
+
+def add_similar(brand: str, product: str):
+    """Register brand/product in the semantic index (no-op when disabled)."""
+    with _semantic_lock:
+        index = _semantic_index()
+        if index is None:
+            return
+        try:
+            snapshot = index.add(brand, product)
+        except Exception as e:
+            print("Semantic cache write error:", e)
+            return
+    if snapshot is None:
+        return
+    try:
+        index.save(snapshot)
+    except (OSError, ValueError) as e:
+        print("Semantic cache write error:", e)
@@ -3,35 +3,126 @@
 Caption adapter using Google Generative REST API (text-bison-001).
 - Uses GEMINI_API_KEY or GOOGLE_API_KEY from environment.
 - Falls back to deterministic template captions if the REST call fails.
+- generate_captions_batch() runs several caption requests concurrently.
+- Successful API results are cached (see adapters/_caption_cache.py).
 """
 
 import os
+import re
+import threading
 import requests
-from typing import List
+from concurrent.futures import ThreadPoolExecutor
+from functools import lru_cache
+from itertools import cycle, islice
+from typing import List, Tuple, TypedDict
+from requests.adapters import HTTPAdapter
+from urllib3.util.retry import Retry
+
+from adapters import _caption_cache
+
+# orjson (optional) encodes/parses the REST payloads much faster than stdlib json
+try:
+    import orjson
+    ORJSON_AVAILABLE = True
+except Exception:
+    orjson = None
+    ORJSON_AVAILABLE = False
+
+# Sentence splitter for single-paragraph responses, and the characters
+# stripped from each caption line (bullets, dashes, whitespace).
+_SENT_RE = re.compile(r'[.!;\n]')
+_LINE_STRIP = " -•\n\r\t"
+
+# Documented text-bison :generate response (only the fields read here)
+class _Candidate(TypedDict, total=False):
+    output: str
+
+class _GenerateResponse(TypedDict, total=False):
+    candidates: List[_Candidate]
+
+# Where the generated text lives in known response shapes, most common first
+_TEXT_PATHS = (
+    ("candidates", 0, "content"),
+    ("candidates", 0, "output"),
+    ("candidates", 0, "text"),
+    ("candidates", 0),
+    ("output",),
+    ("text",),
+    ("content",),
+)
+
+def _walk(data, path):
+    """Follow path through nested dicts/lists; return the str found there, else None."""
+    for k in path:
+        if not isinstance(data, (dict, list)):
+            return None
+        try:
+            data = data[k]
+        except (KeyError, IndexError, TypeError):
+            return None
+    return data if isinstance(data, str) else None
 
 # Template fallback (guaranteed offline)
-def _template_captions(brand, product, n):
-    samples = [
+@lru_cache(maxsize=256)
+def _template_samples(brand, product):
+    return (
         f"{brand} {product} — style meets performance.",
         f"Upgrade your day with the {product} from {brand}.",
         f"Feel the difference with {brand}'s {product}. Shop now!",
         f"The {product} by {brand} — crafted for comfort.",
         f"Special offer: grab the {product} by {brand} today."
-    ]
-    out = []
-    idx = 0
-    for i in range(n):
-        out.append(samples[idx % len(samples)])
-        idx += 1
-    return out
+    )
+
+def _template_captions(brand, product, n):
+    return list(islice(cycle(_template_samples(brand, product)), n))
 
 # Env key
 GEMINI_API_KEY = os.environ.get("GEMINI_API_KEY") or os.environ.get("GOOGLE_API_KEY")
 
+# Upper bound on caption requests in flight at once for a batch
+MAX_CONCURRENT_REQUESTS = 8
+
+_session = None
+_session_lock = threading.Lock()
+
+def _shared_session() -> requests.Session:
+    """
+    Process-wide keep-alive session, so repeat calls reuse the TCP+TLS
+    connection instead of handshaking again (adapters are created per request).
+    Transient 429/5xx responses are retried with backoff.
+    """
+    global _session
+    with _session_lock:
+        if _session is None:
+            session = requests.Session()
+            session.headers.update({"Content-Type": "application/json"})
+            retry = Retry(
+                total=3,
+                backoff_factor=0.3,
+                status_forcelist=[429, 500, 502, 503, 504],
+                allowed_methods=frozenset({"POST"}),
+            )
+            session.mount("https://", HTTPAdapter(pool_connections=10, pool_maxsize=10, max_retries=retry))
+            _session = session
+        return _session
+
 class CaptionAdapter:
     def generate_captions(self, brand: str, product: str, n: int = 5) -> List[str]:
         raise NotImplementedError
 
+    def generate_captions_batch(self, jobs: List[Tuple[str, str, int]]) -> List[List[str]]:
+        """
+        Generate captions for several (brand, product, n) jobs at once.
+        The calls are network-bound, so they are fired concurrently and the
+        batch costs roughly one round trip instead of one per job.
+        Results are returned in the same order as jobs.
+        """
+        if not jobs:
+            return []
+        workers = min(len(jobs), MAX_CONCURRENT_REQUESTS)
+        with ThreadPoolExecutor(max_workers=workers) as ex:
+            return list(ex.map(lambda job: self.generate_captions(*job), jobs))
+
 class GeminiCaptionAdapter(CaptionAdapter):
     """
     Attempts a REST call to Google Generative Text API (text-bison-001).
@@ -41,8 +132,9 @@ class GeminiCaptionAdapter(CaptionAdapter):
         self.api_key = api_key or GEMINI_API_KEY
         # Base URL for Google Generative Text API (REST)
         self.url = "https://generativelanguage.googleapis.com/v1/models/text-bison-001:generate"
+        self._session = _shared_session()
 
-    def _call_rest(self, prompt: str, max_tokens: int = 200):
+    def _call_rest(self, prompt: str, max_tokens: int = 200) -> _GenerateResponse:
         if not self.api_key:
             raise RuntimeError("No GEMINI_API_KEY available")
 
@@ -56,42 +148,46 @@ class GeminiCaptionAdapter(CaptionAdapter):
         }
 
         try:
-            resp = requests.post(self.url, params={"key": self.api_key}, json=payload, timeout=20)
+            if ORJSON_AVAILABLE:
+                # session already sends Content-Type: application/json
+                resp = self._session.post(self.url, params={"key": self.api_key}, data=orjson.dumps(payload), timeout=20)
+                resp.raise_for_status()
+                return orjson.loads(resp.content)
+            resp = self._session.post(self.url, params={"key": self.api_key}, json=payload, timeout=20)
             resp.raise_for_status()
             return resp.json()
         except Exception as e:
             # Bubble up so caller can fallback
             raise RuntimeError(f"Generative REST call failed: {e}")
 
-    def _extract_text_from_response(self, data):
+    def _extract_text_from_response(self, data: _GenerateResponse):
         """
         Defensive parsing: different responses may include:
         - data['candidates'][0]['content']
         - data['candidates'][0]['output']
         - data['output'] (string)
         - or nested structures.
+        The documented shape (candidates[0].output) is read directly; the
+        walkers below only run when the response does not match it.
         """
         if not data:
             return None
 
-        # 1) candidates list (common)
+        try:
+            text = data["candidates"][0]["output"]
+        except (KeyError, IndexError, TypeError):
+            text = None
+        if isinstance(text, str):
+            return text
+
         if isinstance(data, dict):
-            if "candidates" in data and isinstance(data["candidates"], list) and data["candidates"]:
-                first = data["candidates"][0]
-                if isinstance(first, dict):
-                    # 'content' or 'output' keys
-                    for key in ("content", "output", "text"):
-                        if key in first and isinstance(first[key], str):
-                            return first[key]
-                elif isinstance(first, str):
-                    return first
-
-            # 2) direct 'output' or 'text' field
-            for key in ("output", "text", "content"):
-                if key in data and isinstance(data[key], str):
-                    return data[key]
-
-            # 3) nested: try to stringify common shapes
+            # 1) known shapes: candidates list (common), then direct fields
+            for path in _TEXT_PATHS:
+                text = _walk(data, path)
+                if text is not None:
+                    return text
+
+            # 2) nested: try to stringify common shapes
             # Look through dict values for a str
             for v in data.values():
                 if isinstance(v, str) and len(v) > 10:
@@ -108,6 +204,15 @@ class GeminiCaptionAdapter(CaptionAdapter):
         if not self.api_key:
             return _template_captions(brand, product, n)
 
+        key = _caption_cache.cache_key(brand, product, n)
+        cached = _caption_cache.get(key)
+        if cached is None:
+            cached = _caption_cache.get_similar(brand, product, n)
+        if cached is not None:
+            print("caption cache hit:", key)
+            return cached
+        print("caption cache miss:", key)
+
         prompt = (
             f"You are a senior performance marketer and copywriter. "
             f"Generate {n} short, punchy marketing captions (4-12 words) for this product. "
@@ -121,17 +226,21 @@ class GeminiCaptionAdapter(CaptionAdapter):
                 return _template_captions(brand, product, n)
 
             # Split lines heuristically
-            lines = [l.strip(" -•\n\r\t") for l in text.splitlines() if l.strip()]
+            lines = [l.strip(_LINE_STRIP) for l in text.splitlines() if l.strip()]
             # If result is a single paragraph, try split by sentence punctuation
-            if not lines:
-                import re
-                lines = [s.strip() for s in re.split(r'[\\.!;\\n]', text) if s.strip()]
+            if len(lines) == 1:
+                lines = [s.strip(_LINE_STRIP) for s in _SENT_RE.split(text) if s.strip()]
 
             # If still not enough, pad with templates
             out = lines[:n]
             if len(out) < n:
                 out.extend(_template_captions(brand, product, n - len(out)))
-            return out[:n]
+                # short/truncated response: serve the padded list but don't
+                # cache it, so the next request asks the model again
+                return out
+            _caption_cache.put(key, out)
+            _caption_cache.add_similar(brand, product)
+            return out
         except Exception as e:
             # On any failure, use templates (also print for server logs)
             print("Gemini REST caption error:", e)
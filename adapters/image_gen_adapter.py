@@ -9,20 +9,75 @@ Behavior:
 """
 
 import os
+import base64
+import functools
+from concurrent.futures import ThreadPoolExecutor
 from pathlib import Path
-from PIL import Image, ImageDraw, ImageFont
+from PIL import Image, ImageDraw, ImageFont, features
 import io
-
-# Try import Gemini SDK
-try:
-    import google.generativeai as genai
-    GENAI_AVAILABLE = True
-except Exception:
-    genai = None
-    GENAI_AVAILABLE = False
+import zipfile
 
 GEMINI_API_KEY = os.environ.get("GEMINI_API_KEY") or os.environ.get("GOOGLE_API_KEY")
 
+@functools.lru_cache(maxsize=1)
+def _genai():
+    """
+    Gemini SDK, imported on first use and at most once per process: it pulls
+    in grpc/protobuf, which every worker would otherwise pay for at startup
+    even with USE_IMAGE_API=false. None if the SDK is not installed.
+    """
+    try:
+        import google.generativeai as genai
+        return genai
+    except Exception:
+        return None
+
+@functools.lru_cache(maxsize=8)
+def _font(px: int):
+    """TrueType font loaded once per size (falls back to Pillow's default)."""
+    try:
+        return ImageFont.truetype("DejaVuSans-Bold.ttf", px)
+    except Exception:
+        return ImageFont.load_default()
+
+@functools.lru_cache(maxsize=10)  # covers LocalCompositeAdapter's 10-shade cycle
+def _base(size: int, color: tuple):
+    """Master solid-colour canvas; callers must .copy() before drawing on it."""
+    return Image.new('RGB', (size, size), color)
+
+# Encoding and file writes release the GIL, so a small shared pool lets the
+# images of one batch be written in parallel.
+_IO_POOL = ThreadPoolExecutor(max_workers=min(8, os.cpu_count() or 1))
+
+# Encoder settings per output format. Flat colour + text is far smaller and
+# faster to encode as lossy WebP/JPEG than as PNG; for PNG, zlib level 1 is
+# several times faster than the default 6 for ~15% larger files.
+SAVE_OPTS = {
+    "webp": {"format": "WEBP", "quality": 80, "method": 0},
+    "jpg": {"format": "JPEG", "quality": 85},
+    "png": {"format": "PNG", "optimize": False, "compress_level": 1},
+}
+
+# Format for locally rendered placeholder/composite images (PLACEHOLDER_FMT=webp|jpg|png)
+PLACEHOLDER_FMT = os.environ.get("PLACEHOLDER_FMT", "webp").lower().replace("jpeg", "jpg")
+if PLACEHOLDER_FMT not in SAVE_OPTS or (PLACEHOLDER_FMT == "webp" and not features.check("webp")):
+    PLACEHOLDER_FMT = "png"
+
+def _write_bytes(job):
+    data, outp = job
+    with open(outp, "wb") as f:
+        f.write(data)
+    return str(outp)
+
+def _write_b64(job):
+    b64, outp = job
+    return _write_bytes((base64.b64decode(b64), outp))
+
+def _save_image(job):
+    img, outp = job
+    img.save(outp, **SAVE_OPTS[PLACEHOLDER_FMT])
+    return str(outp)
+
 class ImageGenAdapter:
     def generate_images(self, prompt: str, count: int = 1, size: int = 1024, out_dir: str = "./out") -> list:
         raise NotImplementedError
@@ -30,28 +85,46 @@ class ImageGenAdapter:
 class GeminiImageAdapter(ImageGenAdapter):
     def __init__(self, api_key: str = None):
         self.api_key = api_key or GEMINI_API_KEY
-        if GENAI_AVAILABLE and self.api_key:
+        # Image interface of the installed SDK, probed once here rather than on
+        # every call: ("v1", genai.generate_image), ("v2", genai.images.generate)
+        # or ("none", None) when SDK/key are missing or the interface is unknown.
+        self._impl = ("none", None)
+        genai = _genai() if self.api_key else None
+        if genai is not None:
             try:
                 genai.configure(api_key=self.api_key)
             except Exception as e:
                 print("Gemini SDK configure error:", e)
+            if hasattr(genai, "generate_image"):
+                self._impl = ("v1", genai.generate_image)
+            elif hasattr(genai, "images") and hasattr(genai.images, "generate"):
+                self._impl = ("v2", genai.images.generate)
+            else:
+                print("Gemini SDK present but image interface not detected; falling back to placeholders.")
 
-    def generate_images(self, prompt: str, count: int = 1, size: int = 1024, out_dir: str = "./out") -> list:
-        Path(out_dir).mkdir(parents=True, exist_ok=True)
-        saved = []
+    def generate_images(self, prompt: str, count: int = 1, size: int = 1024, out_dir: str = "./out", zf: zipfile.ZipFile = None) -> list:
+        """
+        Generated images are written to out_dir. If zf (an open, writable
+        ZipFile) is given, fallback placeholders skip the disk and go straight
+        into the archive instead; see _local_placeholders.
+        """
+        pending = []  # (b64, path) pairs decoded + written by _IO_POOL
 
-        # If SDK or key missing -> fallback
-        if not GENAI_AVAILABLE or not self.api_key:
-            return self._local_placeholders(prompt, count, size, out_dir)
+        # If SDK or key missing, or no image interface -> fallback
+        kind, generate = self._impl
+        if generate is None:
+            return self._local_placeholders(prompt, count, size, out_dir, zf)
+
+        Path(out_dir).mkdir(parents=True, exist_ok=True)
 
         try:
             # Many SDKs support something like genai.generate_image or genai.images.generate.
             # We'll attempt common call patterns and handle responses defensively.
 
-            # Try modern method 'genai.generate_image' (if present)
-            if hasattr(genai, "generate_image"):
+            # Modern method 'genai.generate_image'
+            if kind == "v1":
                 # Example call: genai.generate_image(model="gpt-image-1", prompt=prompt, size=f"{size}x{size}", n=count)
-                resp = genai.generate_image(model="gpt-image-1", prompt=prompt, size=f"{size}x{size}", n=count)
+                resp = generate(model="gpt-image-1", prompt=prompt, size=f"{size}x{size}", n=count)
                 # resp may have a list of items with 'b64' or 'b64_json' fields
                 items = []
                 if isinstance(resp, dict) and "data" in resp:
@@ -75,16 +148,11 @@ class GeminiImageAdapter(ImageGenAdapter):
                         b64 = getattr(it, "b64", None)
                     if not b64:
                         continue
-                    import base64
-                    img_bytes = base64.b64decode(b64)
-                    outp = Path(out_dir) / f"gemini_img_{i+1:02d}.png"
-                    with open(outp, "wb") as f:
-                        f.write(img_bytes)
-                    saved.append(str(outp))
-
-            # Try alternate path: genai.images.generate (another SDK shape)
-            elif hasattr(genai, "images") and hasattr(genai.images, "generate"):
-                resp = genai.images.generate(model="image-bison-001", prompt=prompt, size=f"{size}x{size}", n=count)
+                    pending.append((b64, Path(out_dir) / f"gemini_img_{i+1:02d}.png"))
+
+            # Alternate path: genai.images.generate (another SDK shape)
+            else:
+                resp = generate(model="image-bison-001", prompt=prompt, size=f"{size}x{size}", n=count)
                 # resp handling similar to above
                 items = []
                 if isinstance(resp, dict) and "data" in resp:
@@ -94,7 +162,6 @@ class GeminiImageAdapter(ImageGenAdapter):
                 else:
                     items = [resp]
 
-                import base64
                 for i, it in enumerate(items):
                     b64 = None
                     if isinstance(it, dict):
@@ -102,59 +169,58 @@ class GeminiImageAdapter(ImageGenAdapter):
                     if not b64 and hasattr(it, "b64_json"):
                         b64 = it.b64_json
                     if b64:
-                        img_bytes = base64.b64decode(b64)
-                        outp = Path(out_dir) / f"gemini_img_{i+1:02d}.png"
-                        with open(outp, "wb") as f:
-                            f.write(img_bytes)
-                        saved.append(str(outp))
+                        pending.append((b64, Path(out_dir) / f"gemini_img_{i+1:02d}.png"))
 
-            else:
-                # SDK present but structure unknown -> try a generic generate_text as fallback
-                txt_resp = genai.generate_text(model="gemini-1.5-mini", prompt=f"Create {count} image descriptions for: {prompt}", max_output_tokens=200)
-                # Not ideal; fallback to placeholder images
-                print("Gemini SDK present but image interface not detected; falling back to placeholders.")
-                return self._local_placeholders(prompt, count, size, out_dir)
+            saved = list(_IO_POOL.map(_write_b64, pending))
 
             # If nothing saved, fallback
             if not saved:
-                return self._local_placeholders(prompt, count, size, out_dir)
+                return self._local_placeholders(prompt, count, size, out_dir, zf)
             return saved
 
         except Exception as e:
             print("Gemini image generation error:", e)
-            return self._local_placeholders(prompt, count, size, out_dir)
+            return self._local_placeholders(prompt, count, size, out_dir, zf)
+
+    def _local_placeholders(self, prompt, count, size, out_dir=None, zf=None):
+        """
+        Write count placeholder images to out_dir, or, when zf is given, store
+        them directly as ZIP entries under out_dir's folder name (so the archive
+        layout matches the on-disk one). Returns file paths / archive names.
+        """
+        # Every placeholder carries the same text, so rasterize it once
+        # and only re-encode the finished image per file.
+        img = _base(size, (240, 240, 245)).copy()
+        draw = ImageDraw.Draw(img)
+        text = f"[Gemini Placeholder]\n{prompt[:80]}"
+        draw.multiline_text((30,30), text, fill=(30,30,30), font=_font(28))
+        # Identical pixels -> identical encoded bytes: encode once, write count copies.
+        buf = io.BytesIO()
+        img.save(buf, **SAVE_OPTS[PLACEHOLDER_FMT])
+        data = buf.getvalue()
+        names = [f"gemini_placeholder_{i+1:02d}.{PLACEHOLDER_FMT}" for i in range(count)]
+
+        if zf is not None:
+            arc_dir = Path(out_dir).name if out_dir else ""
+            arcnames = [f"{arc_dir}/{name}" if arc_dir else name for name in names]
+            for arcname in arcnames:
+                zf.writestr(arcname, data, compress_type=zipfile.ZIP_STORED)
+            return arcnames
 
-    def _local_placeholders(self, prompt, count, size, out_dir):
         Path(out_dir).mkdir(parents=True, exist_ok=True)
-        saved = []
-        for i in range(count):
-            img = Image.new('RGB', (size, size), (240, 240, 245))
-            draw = ImageDraw.Draw(img)
-            try:
-                font = ImageFont.truetype("DejaVuSans-Bold.ttf", 28)
-            except:
-                font = ImageFont.load_default()
-            text = f"[Gemini Placeholder]\n{prompt[:80]}"
-            draw.multiline_text((30,30), text, fill=(30,30,30), font=font)
-            outp = Path(out_dir) / f"gemini_placeholder_{i+1:02d}.png"
-            img.save(outp)
-            saved.append(str(outp))
-        return saved
+        jobs = [(data, Path(out_dir) / name) for name in names]
+        return list(_IO_POOL.map(_write_bytes, jobs))
 
 class LocalCompositeAdapter(ImageGenAdapter):
     """Simple local compositing adapter (keeps earlier behavior)."""
     def generate_images(self, prompt: str, count: int = 1, size: int = 1024, out_dir: str = "./out") -> list:
         Path(out_dir).mkdir(parents=True, exist_ok=True)
-        saved = []
+        jobs = []
         for i in range(count):
-            img = Image.new('RGB', (size, size), tuple([200 + (i*5)%50]*3))
+            img = _base(size, tuple([200 + (i*5)%50]*3)).copy()
             draw = ImageDraw.Draw(img)
-            try:
-                font = ImageFont.truetype("DejaVuSans-Bold.ttf", 32)
-            except:
-                font = ImageFont.load_default()
+            font = _font(32)
             draw.text((40, size//2 - 20), prompt[:40] + ("..." if len(prompt)>40 else ""), fill=(255,255,255), font=font)
-            outp = Path(out_dir)/f"local_composite_{i+1:02d}.png"
-            img.save(outp)
-            saved.append(str(outp))
-        return saved
+            jobs.append((img, Path(out_dir)/f"local_composite_{i+1:02d}.{PLACEHOLDER_FMT}"))
+        # Images are built serially (glyph work is small); encoding runs on the pool.
+        return list(_IO_POOL.map(_save_image, jobs))
@@ -10,16 +10,18 @@ Wiring:
 from dotenv import load_dotenv
 load_dotenv()  # loads .env into os.environ if present
 
+import io
 import os
 import uuid
 from pathlib import Path
 import zipfile
+from concurrent.futures import ThreadPoolExecutor
 from flask import Flask, request, send_file, render_template, redirect, url_for, flash
 from werkzeug.utils import secure_filename
 
 # Local modules
 from generate_creatives import generate_variations
-from utils import create_zip, safe_filename
+from utils import add_folder_to_zip, safe_filename, save_upload
 
 # Import adapters (these files should exist under adapters/)
 # They implement GeminiImageAdapter, LocalCompositeAdapter, GeminiCaptionAdapter.
@@ -55,6 +57,33 @@ ALLOWED_EXT = {"png", "jpg", "jpeg"}
 def allowed(filename: str) -> bool:
     return "." in filename and filename.rsplit(".", 1)[1].lower() in ALLOWED_EXT
 
+def _gemini_images(brand: str, product: str, run_dir: Path, zf: zipfile.ZipFile = None):
+    """
+    Attempt to produce a small set of generated product images (optional).
+    These generated images can be composited into final creatives (optional improvement).
+    Placeholder fallbacks are written straight into zf when it is given.
+    """
+    try:
+        img_adapter = GeminiImageAdapter()
+        sd_out = run_dir / "gemini_images"
+        sd_paths = img_adapter.generate_images(prompt=f"Product photo of {product} by {brand}", count=6, size=1024, out_dir=str(sd_out), zf=zf)
+        print("Gemini image produced:", sd_paths)
+        return sd_paths
+    except Exception as e:
+        print("Gemini Image adapter failed (continuing):", e)
+        return None
+
+def _gemini_captions(brand: str, product: str):
+    """Caption generation via Gemini; returns None so callers keep template captions on failure."""
+    try:
+        llm_adapter = GeminiCaptionAdapter()
+        captions_list = llm_adapter.generate_captions(brand, product, n=12)
+        print("Gemini captions sample:", captions_list[:3])
+        return captions_list
+    except Exception as e:
+        print("Gemini caption adapter failed (will use template captions):", e)
+        return None
+
 @app.route("/", methods=["GET"])
 def index():
     return render_template("index.html")
@@ -86,69 +115,69 @@ def generate():
     product_fname = safe_filename(product_file.filename)
     logo_path = run_dir / f"logo_{logo_fname}"
     product_path = run_dir / f"product_{product_fname}"
-    logo_file.save(logo_path)
-    product_file.save(product_path)
+    save_upload(logo_file, logo_path)
+    save_upload(product_file, product_path)
 
     # Read env flags
     use_image_api = os.environ.get("USE_IMAGE_API", "false").lower() == "true"
     use_llm = os.environ.get("USE_LLM", "false").lower() == "true"
 
-    # === Image generation step (Gemini) ===
-    # Attempt to produce a small set of generated product images (optional).
-    # These generated images can be composited into final creatives (optional improvement).
-    if use_image_api and 'GeminiImageAdapter' in globals():
-        try:
-            img_adapter = GeminiImageAdapter()
-            sd_out = run_dir / "gemini_images"
-            sd_paths = img_adapter.generate_images(prompt=f"Product photo of {product} by {brand}", count=6, size=1024, out_dir=str(sd_out))
-            print("Gemini image produced:", sd_paths)
-        except Exception as e:
-            print("Gemini Image adapter failed (continuing):", e)
-
-    # === Caption generation step (Gemini) ===
-    captions_list = None
-    if use_llm and 'GeminiCaptionAdapter' in globals():
-        try:
-            llm_adapter = GeminiCaptionAdapter()
-            captions_list = llm_adapter.generate_captions(brand, product, n=12)
-            print("Gemini captions sample:", captions_list[:3])
-        except Exception as e:
-            print("Gemini caption adapter failed (will use template captions):", e)
-            captions_list = None
-
-    # === Always produce final creatives using local compositor ===
-    try:
-        generate_variations(str(logo_path), str(product_path), out_dir=str(run_dir), n=12, size=1200, brand_name=brand, product_name=product)
-    except Exception as e:
-        # If the compositor fails, log and return an error to the user
-        print("Error during generate_variations:", e)
-        flash("Generation failed on server. Check server logs.")
-        return redirect(url_for("index"))
-
-    # === If captions_list produced by Gemini, overwrite captions.txt ===
-    if captions_list:
+    # The ZIP is built in memory: it is only ever streamed back to the client,
+    # so writing it to disk first would just mean reading it back again.
+    # It is opened up front so fallback placeholder images can be stored in it
+    # directly instead of making a round trip through run_dir.
+    zip_buf = io.BytesIO()
+    with zipfile.ZipFile(zip_buf, "w", allowZip64=True) as zf:
+        # === Gemini image + caption steps, and the local compositor ===
+        # The two Gemini calls are independent network round trips and the
+        # compositor only needs the uploaded files, so all three run side by side;
+        # the request takes as long as the slowest stage instead of their sum.
+        # Only the image stage writes to zf while they run.
+        with ThreadPoolExecutor(max_workers=3) as ex:
+            fut_img = ex.submit(_gemini_images, brand, product, run_dir, zf) if use_image_api else None
+            fut_cap = ex.submit(_gemini_captions, brand, product) if use_llm else None
+            # Always produce final creatives using local compositor. Render inline
+            # (workers=1): requests already run in parallel on the server's threads,
+            # and a process pool per request would fork ncpu cold renderers each time.
+            fut_comp = ex.submit(generate_variations, str(logo_path), str(product_path), out_dir=str(run_dir), n=12, size=1200, brand_name=brand, product_name=product, workers=1)
+
+            if fut_img:
+                fut_img.result()
+            captions_list = fut_cap.result() if fut_cap else None
+            try:
+                creatives = fut_comp.result()
+            except Exception as e:
+                # If the compositor fails, log and return an error to the user
+                print("Error during generate_variations:", e)
+                flash("Generation failed on server. Check server logs.")
+                return redirect(url_for("index"))
+
+        # === If captions_list produced by Gemini, overwrite captions.txt ===
+        if captions_list:
+            try:
+                # The compositor reports the creatives it wrote; no need to rescan run_dir
+                out_lines = []
+                for idx, img in enumerate(creatives[:len(captions_list)]):
+                    out_lines.append(f"{img.name}\t{captions_list[idx]}")
+                (run_dir / "captions.txt").write_text("\n".join(out_lines), encoding="utf-8")
+            except Exception as e:
+                print("Failed to write Gemini captions to captions.txt:", e)
+
+        # === Package into ZIP and send ===
         try:
-            img_files = sorted([p for p in run_dir.iterdir() if p.suffix.lower() in [".jpg", ".jpeg", ".png"]])
-            out_lines = []
-            for idx, img in enumerate(img_files[:len(captions_list)]):
-                out_lines.append(f"{img.name}\t{captions_list[idx]}")
-            (run_dir / "captions.txt").write_text("\n".join(out_lines), encoding="utf-8")
+            add_folder_to_zip(zf, run_dir)
         except Exception as e:
-            print("Failed to write Gemini captions to captions.txt:", e)
-
-    # === Package into ZIP and send ===
-    zip_path = RUNS / f"{run_id}.zip"
-    try:
-        create_zip(run_dir, zip_path)
-    except Exception as e:
-        print("Failed to create zip:", e)
-        flash("Packaging failed on server.")
-        return redirect(url_for("index"))
+            print("Failed to create zip:", e)
+            flash("Packaging failed on server.")
+            return redirect(url_for("index"))
+    zip_buf.seek(0)
 
     # Serve file to user
     download_name = f"{brand}_{product}_creatives.zip".replace(" ", "_")
-    return send_file(zip_path, as_attachment=True, download_name=download_name)
+    return send_file(zip_buf, mimetype="application/zip", as_attachment=True, download_name=download_name)
 
 if __name__ == "__main__":
     # port and debug can be adjusted for production / demo
+    # (the dev server is already threaded by default; for real deployments
+    # see the gunicorn / waitress notes in the README)
     app.run(debug=True, port=int(os.environ.get("PORT", 5000)))
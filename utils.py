@@ -1,13 +1,70 @@
 # utils.py
+import os
+import shutil
 from pathlib import Path
+from typing import BinaryIO, Union
 import zipfile
 from werkzeug.utils import secure_filename
 
-def create_zip(folder: Path, zip_path: Path):
-    with zipfile.ZipFile(zip_path, 'w') as z:
-        for f in folder.iterdir():
-            z.write(f, arcname=f.name)
+# Already-compressed image formats gain nothing from DEFLATE; store them as-is.
+STORED_SUFFIXES = {".png", ".jpg", ".jpeg", ".webp"}
+# Everything else is small text; level 1 is several times faster than 6 for a few % of size.
+DEFLATE_LEVEL = 1
+
+def add_folder_to_zip(z: zipfile.ZipFile, folder: Path):
+    # Adds every file under folder to an already-open archive, paths relative to folder
+    for f in folder.rglob('*'):
+        if not f.is_file():
+            continue
+        if f.suffix.lower() in STORED_SUFFIXES:
+            z.write(f, arcname=f.relative_to(folder).as_posix(), compress_type=zipfile.ZIP_STORED)
+        else:
+            z.write(f, arcname=f.relative_to(folder).as_posix(), compress_type=zipfile.ZIP_DEFLATED, compresslevel=DEFLATE_LEVEL)
+
+def create_zip(folder: Path, zip_path: Union[Path, BinaryIO]):
+    # zip_path may also be a writable file object (e.g. io.BytesIO) to build the archive in memory
+    with zipfile.ZipFile(zip_path, 'w', allowZip64=True) as z:
+        add_folder_to_zip(z, folder)
     return zip_path
 
 def safe_filename(name: str) -> str:
     return secure_filename(name)
+
+# Copy buffer for uploads (FileStorage.save defaults to 16 KiB reads)
+COPY_BUFSIZE = 1 << 20
+
+def _os_fileno(stream):
+    # fileno() only if the stream is already a real OS file; asking a
+    # SpooledTemporaryFile that is still in memory would force it to disk.
+    if getattr(stream, "_rolled", True) is False:
+        return None
+    try:
+        return stream.fileno()
+    except (AttributeError, OSError, ValueError):
+        return None
+
+def save_upload(upload, dest: Path):
+    """
+    Write an uploaded werkzeug FileStorage to dest.
+    Uses os.sendfile (kernel-side copy) when the upload is spooled to a temp
+    file, otherwise a buffered copy with a 1 MiB chunk size.
+    """
+    src = upload.stream
+    with open(dest, "wb") as dst:
+        src_fd = _os_fileno(src) if hasattr(os, "sendfile") else None
+        if src_fd is not None:
+            try:
+                offset = src.tell()
+                size = os.fstat(src_fd).st_size
+                while offset < size:
+                    sent = os.sendfile(dst.fileno(), src_fd, offset, size - offset)
+                    if sent == 0:
+                        break
+                    offset += sent
+                return dest
+            except OSError:
+                # e.g. filesystem without sendfile support; start over with a plain copy
+                dst.seek(0)
+                dst.truncate()
+        shutil.copyfileobj(src, dst, length=COPY_BUFSIZE)
+    return dest